@@ -1,26 +1,112 @@
 import os
-import json
-import hashlib
+import base64
+import sqlite3
 import secrets
 import time
+import functools
+import orjson
 import requests
-from typing import Dict, Tuple
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from typing import Dict, List
 from eth_keys.datatypes import PrivateKey
-from eth_utils import keccak, to_hex, to_bytes
-from eth_abi import encode_abi
-from eth_abi.abi import encode_typed
+from eth_utils import keccak, to_bytes
+from eth_abi import encode as encode_abi
 from cryptography.fernet import Fernet
-import base58
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+# EIP-712 struct type hashes, keccak256(encodeType(...)) of the fixed schemas
+DOMAIN_TYPE_HASH = keccak(
+    b"EIP712Domain(string name,string version,uint256 chainId,address verifyingContract,bytes32 salt)"
+)
+AGENT_TYPE_HASH = keccak(
+    b"Agent(string litLayer,address agentAddress,string platform,uint256 expiryTime)"
+)
+
+# ABI layouts of the encoded struct fields (dynamic strings are hashed to bytes32)
+_DOMAIN_ABI_TYPES = ["bytes32", "bytes32", "uint256", "address", "bytes32"]
+_AGENT_ABI_TYPES = ["bytes32", "address", "bytes32", "uint256"]
+
+@functools.lru_cache(maxsize=64)
+def _hash_string(value: str) -> bytes:
+    """keccak256 of an EIP-712 string field; environment/platform/domain strings repeat"""
+    return keccak(value.encode())
+
+def _encode_agent(lit_layer: str, agent_address: str, platform: str, expiry_time: int) -> bytes:
+    """hashStruct of an Agent message, specialized for the fixed Agent schema"""
+    return keccak(AGENT_TYPE_HASH + encode_abi(
+        _AGENT_ABI_TYPES,
+        [_hash_string(lit_layer), agent_address, _hash_string(platform), expiry_time]
+    ))
+
+def pretty_json(obj) -> str:
+    """Pretty-print JSON (2-space indent, sorted keys) using orjson"""
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS).decode()
+
+@functools.lru_cache(maxsize=16)
+def _priv_from_hex(private_key: str) -> PrivateKey:
+    """Parse a 0x-prefixed hex private key, caching the parsed key object"""
+    return PrivateKey(bytes.fromhex(private_key[2:]))
+
+# Environment variable holding the master secret for at-rest session encryption
+STORE_KEY_ENV = "LITLAYER_STORE_KEY"
+
+def derive_store_key(secret: bytes, salt: bytes = b"litlayer-v1") -> bytes:
+    """
+    Derive a Fernet key from a master secret with PBKDF2-HMAC-SHA256.
+    
+    Args:
+        secret: Master secret
+        salt: KDF salt
+        
+    Returns:
+        URL-safe base64 encoded 32-byte Fernet key
+    """
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=200_000)
+    return base64.urlsafe_b64encode(kdf.derive(secret))
+
+# (connect, read) timeouts in seconds for calls to the LitLayer API
+HTTP_TIMEOUT = (3.05, 10)
+
+def create_http_session(pool_maxsize: int = 32) -> requests.Session:
+    """
+    Create a requests session with a keep-alive connection pool.
+    
+    Connection errors and 502/503/504 responses are retried with backoff;
+    POST requests are only retried when the request never reached the server.
+    
+    Args:
+        pool_maxsize: Maximum number of pooled connections per host
+        
+    Returns:
+        Configured requests session
+    """
+    retry = Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+    adapter = HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
 class KeyGenerator:
+    # Lifetime of an agent registration signature
+    AGENT_EXPIRY_SECONDS = 86400
+
     def __init__(self, base_url: str = "https://api.litlayer.com"):
         self.base_url = base_url.rstrip('/')
+        self._session = create_http_session()
         self.storage_dir = ".keys"
-        if not os.path.exists(self.storage_dir):
-            os.makedirs(self.storage_dir)
+        os.makedirs(self.storage_dir, exist_ok=True)
+        self._db = self._open_session_store(os.path.join(self.storage_dir, "sessions.db"))
+        
+        # Session blobs are encrypted at rest when a master secret is configured.
+        # The key is derived once here, not per save.
+        secret = os.environb.get(STORE_KEY_ENV.encode())
+        self._fernet = Fernet(derive_store_key(secret)) if secret else None
         
-        # EIP-712 domain data
-        self.domain = {
+        # EIP-712 domain data (the setter caches the domain separator)
+        self._domain = {
             "name": "LitLayer",
             "version": "v1",
             "chainId": 42161,  # Arbitrum
@@ -44,6 +130,22 @@ class KeyGenerator:
                 {"name": "salt", "type": "bytes32"}
             ]
         }
+        self._domain_separator = self._encode_domain(self._domain)
+
+    @property
+    def domain(self) -> Dict:
+        """EIP-712 domain data"""
+        return self._domain
+
+    @domain.setter
+    def domain(self, domain: Dict):
+        self._domain = domain
+        self._domain_separator = self._encode_domain(domain)
+
+    def close(self):
+        """Close pooled HTTP connections and the session key store"""
+        self._session.close()
+        self._db.close()
 
     def generate_trading_key(self, agent_address: str) -> str:
         """
@@ -56,9 +158,25 @@ class KeyGenerator:
         Returns:
             Private key in hex format
         """
-        # Generate a truly random private key using ECDSA Secp256k1
-        private_key = PrivateKey(secrets.token_bytes(32))
-        return f"0x{private_key.to_hex()}"
+        return self.generate_trading_keys(1)[0]
+
+    def generate_trading_keys(self, n: int) -> List[str]:
+        """
+        Generate several trading private keys from a single CSPRNG read.
+        
+        Args:
+            n: Number of keys to generate
+            
+        Returns:
+            Private keys in hex format
+        """
+        # One os.urandom call for all keys; each 32-byte slice is a
+        # secp256k1 private key validated by PrivateKey
+        raw = os.urandom(32 * n)
+        return [
+            PrivateKey(raw[i:i + 32]).to_hex()
+            for i in range(0, 32 * n, 32)
+        ]
 
     def prepare_eip712_data(
         self,
@@ -75,10 +193,11 @@ class KeyGenerator:
             environment: Environment (Devnet, Testnet, Mainnet)
             
         Returns:
-            Dict containing EIP-712 domain data and message
+            Dict containing EIP-712 domain data and message. The domain and
+            types entries are shared with this generator and must not be mutated.
         """
         # Calculate expiry time (24 hours from now)
-        expiry_time = int(time.time()) + 86400
+        expiry_time = int(time.time()) + self.AGENT_EXPIRY_SECONDS
         
         # Prepare EIP-712 message
         message = {
@@ -88,8 +207,9 @@ class KeyGenerator:
             "expiryTime": expiry_time
         }
         
+        # domain/types are shared by reference, only the message is new per call
         return {
-            "domain": self.domain,
+            "domain": self._domain,
             "types": self.types,
             "message": message
         }
@@ -104,39 +224,39 @@ class KeyGenerator:
         Returns:
             The encoded data as bytes
         """
-        # Encode domain separator
-        domain_separator = self._encode_domain(data["domain"])
+        # Reuse the cached domain separator unless a foreign domain was passed
+        if data["domain"] is self._domain:
+            domain_separator = self._domain_separator
+        else:
+            domain_separator = self._encode_domain(data["domain"])
         
         # Encode the message
-        message_hash = self._encode_message(data["types"], data["message"])
+        message_hash = self._encode_message(data["message"])
         
         # Combine domain separator and message hash
         return keccak(b"\x19\x01" + domain_separator + message_hash)
 
     def _encode_domain(self, domain: Dict) -> bytes:
         """Encode the domain separator"""
-        return keccak(encode_typed(
-            self.types["EIP712Domain"],
+        return keccak(DOMAIN_TYPE_HASH + encode_abi(
+            _DOMAIN_ABI_TYPES,
             [
-                domain["name"],
-                domain["version"],
+                _hash_string(domain["name"]),
+                _hash_string(domain["version"]),
                 domain["chainId"],
                 domain["verifyingContract"],
-                domain["salt"]
+                to_bytes(hexstr=domain["salt"])
             ]
         ))
 
-    def _encode_message(self, types: Dict, message: Dict) -> bytes:
+    def _encode_message(self, message: Dict) -> bytes:
         """Encode the message data"""
-        return keccak(encode_typed(
-            types["Agent"],
-            [
-                message["litLayer"],
-                message["agentAddress"],
-                message["platform"],
-                message["expiryTime"]
-            ]
-        ))
+        return _encode_agent(
+            message["litLayer"],
+            message["agentAddress"],
+            message["platform"],
+            message["expiryTime"]
+        )
 
     def sign_eip712_data(self, eip712_data: Dict, private_key: str) -> str:
         """
@@ -149,9 +269,8 @@ class KeyGenerator:
         Returns:
             Signature in hex format
         """
-        # Convert private key to bytes
-        private_key_bytes = bytes.fromhex(private_key[2:])
-        private_key_obj = PrivateKey(private_key_bytes)
+        # Reuse the parsed key when signing repeatedly with the same key
+        private_key_obj = _priv_from_hex(private_key)
         
         # Encode the typed data
         encoded_data = self.encode_typed_data(eip712_data)
@@ -160,6 +279,24 @@ class KeyGenerator:
         signature = private_key_obj.sign_msg_hash(encoded_data)
         return signature.to_hex()
 
+    def batch_sign_eip712_data(self, eip712_data_list: List[Dict], private_key: str) -> List[str]:
+        """
+        Sign several EIP-712 structured data payloads with the same key.
+        
+        Args:
+            eip712_data_list: The EIP-712 data payloads to sign
+            private_key: The private key to sign with
+            
+        Returns:
+            Signatures in hex format, in input order
+        """
+        private_key_obj = _priv_from_hex(private_key)
+        encode = self.encode_typed_data
+        return [
+            private_key_obj.sign_msg_hash(encode(data)).to_hex()
+            for data in eip712_data_list
+        ]
+
     def submit_exchange_request(
         self,
         agent_address: str,
@@ -202,13 +339,18 @@ class KeyGenerator:
             'X-API-Key': api_key
         }
         
-        response = requests.post(url, json=payload, headers=headers)
+        response = self._session.post(
+            url,
+            data=orjson.dumps(payload),
+            headers=headers,
+            timeout=HTTP_TIMEOUT
+        )
         
         # Check response status
         if response.status_code != 200:
             error_msg = f"Failed to submit exchange request: {response.text}"
             try:
-                error_data = response.json()
+                error_data = orjson.loads(response.content)
                 if "error" in error_data:
                     error_msg = f"Exchange request failed: {error_data['error']}"
             except:
@@ -216,28 +358,59 @@ class KeyGenerator:
             raise Exception(error_msg)
             
         # Return the raw response
-        return response.json()
+        return orjson.loads(response.content)
+
+    @staticmethod
+    def _open_session_store(db_path: str) -> sqlite3.Connection:
+        """Open (and create if needed) the SQLite session key store"""
+        db = sqlite3.connect(db_path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS session_keys (key TEXT PRIMARY KEY, data BLOB NOT NULL)"
+        )
+        return db
 
     def save_session_keys(self, wallet_address: str, session_id: str, key_data: Dict):
-        """Save session keys to storage"""
-        file_path = os.path.join(self.storage_dir, f"{wallet_address}_{session_id}.key")
-        with open(file_path, "w") as f:
-            json.dump(key_data, f)
+        """Save session keys to storage, encrypted if LITLAYER_STORE_KEY is set"""
+        blob = orjson.dumps(key_data)
+        if self._fernet is not None:
+            blob = self._fernet.encrypt(blob)
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO session_keys (key, data) VALUES (?, ?)",
+                (f"{wallet_address}/{session_id}", blob)
+            )
 
     def load_session_keys(self, wallet_address: str, session_id: str) -> Dict:
         """Load session keys from storage"""
-        file_path = os.path.join(self.storage_dir, f"{wallet_address}_{session_id}.key")
-        if not os.path.exists(file_path):
+        row = self._db.execute(
+            "SELECT data FROM session_keys WHERE key = ?",
+            (f"{wallet_address}/{session_id}",)
+        ).fetchone()
+        if row is None:
             return None
             
-        with open(file_path, "r") as f:
-            return json.load(f)
+        return self._decode_session_blob(row[0])
+
+    def _decode_session_blob(self, blob: bytes) -> Dict:
+        """Decrypt (if configured) and decode a stored session blob"""
+        if self._fernet is not None:
+            blob = self._fernet.decrypt(blob)
+        return orjson.loads(blob)
 
     def delete_session_keys(self, wallet_address: str, session_id: str):
         """Delete stored session keys"""
-        file_path = os.path.join(self.storage_dir, f"{wallet_address}_{session_id}.key")
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        with self._db:
+            self._db.execute(
+                "DELETE FROM session_keys WHERE key = ?",
+                (f"{wallet_address}/{session_id}",)
+            )
+
+    def export_session_keys(self, file_path: str):
+        """Export all stored sessions (decrypted) to a JSON file for debugging"""
+        rows = self._db.execute("SELECT key, data FROM session_keys ORDER BY key").fetchall()
+        with open(file_path, "w") as f:
+            f.write(pretty_json({key: self._decode_session_blob(data) for key, data in rows}))
 
 def main():
     """Example usage of the KeyGenerator"""
@@ -258,7 +431,7 @@ def main():
         platform="turbox",
         environment="Devnet"
     )
-    print(f"EIP-712 data: {json.dumps(eip712_data, indent=2)}")
+    print(f"EIP-712 data: {pretty_json(eip712_data)}")
     
     # 3. Sign the EIP-712 data
     print("\nSigning EIP-712 data...")
@@ -277,7 +450,7 @@ def main():
             api_key=api_key
         )
         print("\nExchange request successful!")
-        print(f"Response: {json.dumps(response, indent=2)}")
+        print(f"Response: {pretty_json(response)}")
     except Exception as e:
         print(f"\nError submitting exchange request: {e}")
         return
@@ -298,7 +471,7 @@ def main():
     # 6. Load session data
     print("\nLoading session data...")
     loaded_keys = generator.load_session_keys(wallet_address, session_id)
-    print(f"Loaded session data: {json.dumps(loaded_keys, indent=2)}")
+    print(f"Loaded session data: {pretty_json(loaded_keys)}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
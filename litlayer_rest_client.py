@@ -1,17 +1,60 @@
-import json
 import time
-import requests
-from typing import Dict, Optional
-from key_generator import KeyGenerator
+import asyncio
+import httpx
+import orjson
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from key_generator import KeyGenerator, HTTP_TIMEOUT, create_http_session, pretty_json
+
+@dataclass(frozen=True, slots=True)
+class Session:
+    """Immutable snapshot of a signed trading session"""
+    wallet_address: str
+    agent_address: str
+    trading_key: str
+    eip712_data: Dict
+    signature: str
 
 class LitLayerRestClient:
     def __init__(self, base_url: str = "https://api.litlayer.com", api_key: str = None):
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
         self.key_generator = KeyGenerator(base_url)
-        self.session_data = None
+        self.session_data: Optional[Session] = None
+        self._session = create_http_session()
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._default_headers = {
+            'Content-Type': 'application/json',
+            'X-API-Key': api_key
+        }
+
+    def close(self):
+        """Close pooled HTTP connections"""
+        self._session.close()
+        self.key_generator.close()
 
-    def generate_session(self, wallet_address: str, agent_address: str) -> Dict:
+    def open_async_client(self) -> httpx.AsyncClient:
+        """
+        Get the shared async HTTP/2 client, creating it on first use.
+        
+        Returns:
+            The shared httpx.AsyncClient
+        """
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                timeout=10.0
+            )
+        return self._async_client
+
+    async def aclose(self):
+        """Close the shared async HTTP client"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def generate_session(self, wallet_address: str, agent_address: str) -> Session:
         """
         Generate a new session with trading key and signature.
         
@@ -20,7 +63,7 @@ class LitLayerRestClient:
             agent_address: The agent address
             
         Returns:
-            Dict containing session data
+            The new session
         """
         # Generate trading key
         trading_key = self.key_generator.generate_trading_key(agent_address)
@@ -34,13 +77,13 @@ class LitLayerRestClient:
         signature = self.key_generator.sign_eip712_data(eip712_data, trading_key)
         
         # Store session data
-        self.session_data = {
-            "wallet_address": wallet_address,
-            "agent_address": agent_address,
-            "trading_key": trading_key,
-            "eip712_data": eip712_data,
-            "signature": signature
-        }
+        self.session_data = Session(
+            wallet_address=wallet_address,
+            agent_address=agent_address,
+            trading_key=trading_key,
+            eip712_data=eip712_data,
+            signature=signature
+        )
         
         return self.session_data
 
@@ -67,30 +110,74 @@ class LitLayerRestClient:
             raise Exception("API key not set")
             
         url = f"{self.base_url}/{endpoint}"
-        headers = {
-            'Content-Type': 'application/json',
-            'X-API-Key': self.api_key
-        }
         
-        # If using session, add signature to payload
-        if use_session and self.session_data:
-            payload["signature"] = self.session_data["signature"]
+        payload = self._with_signature(payload, use_session)
         
-        response = requests.request(method, url, json=payload, headers=headers)
+        response = self._session.request(
+            method,
+            url,
+            data=orjson.dumps(payload),
+            headers=self._default_headers,
+            timeout=HTTP_TIMEOUT
+        )
+        return self._parse_response(response)
+
+    async def make_signed_request_async(
+        self,
+        method: str,
+        endpoint: str,
+        payload: Dict,
+        use_session: bool = True
+    ) -> Dict:
+        """
+        Make a signed request to the API without blocking the event loop.
         
+        Args:
+            method: HTTP method (GET, POST, etc.)
+            endpoint: API endpoint (e.g., 'v1/withdraw/submit')
+            payload: Request payload
+            use_session: Whether to use session signature
+            
+        Returns:
+            API response
+        """
+        if not self.api_key:
+            raise Exception("API key not set")
+            
+        url = f"{self.base_url}/{endpoint}"
+        
+        payload = self._with_signature(payload, use_session)
+        
+        response = await self.open_async_client().request(
+            method,
+            url,
+            content=orjson.dumps(payload),
+            headers=self._default_headers
+        )
+        return self._parse_response(response)
+
+    def _with_signature(self, payload: Dict, use_session: bool) -> Dict:
+        """Return the payload with the session signature attached, without mutating it"""
+        session = self.session_data
+        if use_session and session:
+            return {**payload, "signature": session.signature}
+        return payload
+
+    def _parse_response(self, response) -> Dict:
+        """Raise on API errors, otherwise return the decoded response body"""
         if response.status_code != 200:
             error_msg = f"Request failed: {response.text}"
             try:
-                error_data = response.json()
+                error_data = orjson.loads(response.content)
                 if "error" in error_data:
                     error_msg = f"API error: {error_data['error']}"
             except:
                 pass
             raise Exception(error_msg)
             
-        return response.json()
+        return orjson.loads(response.content)
 
-    def submit_withdrawal(
+    async def submit_withdrawal(
         self,
         token_address: str,
         amount: str,
@@ -113,9 +200,9 @@ class LitLayerRestClient:
             "recipient_address": recipient_address
         }
         
-        return self.make_signed_request("POST", "v1/withdraw/submit", payload)
+        return await self.make_signed_request_async("POST", "v1/withdraw/submit", payload)
 
-    def create_order(
+    async def create_order(
         self,
         token_in: str,
         token_out: str,
@@ -144,9 +231,49 @@ class LitLayerRestClient:
             "is_market": is_market
         }
         
-        return self.make_signed_request("POST", "v1/order/create", payload)
+        return await self.make_signed_request_async("POST", "v1/order/create", payload)
+
+    async def submit_batch(self, ops: List[Tuple[str, Dict]]) -> List[Dict]:
+        """
+        Submit several signed POST requests concurrently over the shared
+        HTTP/2 connection, e.g. a withdrawal followed by a set of orders.
+        
+        Args:
+            ops: (endpoint, payload) pairs, e.g. ("v1/order/create", {...})
+            
+        Returns:
+            API responses in the same order as ops. A failed request raises
+            its exception after all requests have completed.
+        """
+        results = await asyncio.gather(
+            *(self.make_signed_request_async("POST", endpoint, payload) for endpoint, payload in ops),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
+
+    def submit_batch_sync(self, ops: List[Tuple[str, Dict]]) -> List[Dict]:
+        """
+        Blocking variant of submit_batch for callers without an event loop.
+        
+        Args:
+            ops: (endpoint, payload) pairs
+            
+        Returns:
+            API responses in the same order as ops
+        """
+        async def run():
+            try:
+                return await self.submit_batch(ops)
+            finally:
+                # The async client is bound to this short-lived loop
+                await self.aclose()
+        
+        return asyncio.run(run())
 
-def main():
+async def main():
     """Example usage of the LitLayerRestClient"""
     # Initialize client
     client = LitLayerRestClient(
@@ -162,30 +289,33 @@ def main():
         # 1. Generate session
         print("Generating session...")
         session = client.generate_session(wallet_address, agent_address)
-        print(f"Session generated: {json.dumps(session, indent=2)}")
+        print(f"Session generated: {pretty_json(session)}")
         
         # 2. Submit withdrawal
         print("\nSubmitting withdrawal...")
-        withdrawal = client.submit_withdrawal(
+        withdrawal = await client.submit_withdrawal(
             token_address="0x82aF49447D8a07e3bd95BD0d56f35241523fBab1",  # WETH on Arbitrum
             amount="1000000000000000000",  # 1 WETH
             recipient_address=wallet_address
         )
-        print(f"Withdrawal response: {json.dumps(withdrawal, indent=2)}")
+        print(f"Withdrawal response: {pretty_json(withdrawal)}")
         
         # 3. Create order
         print("\nCreating order...")
-        order = client.create_order(
+        order = await client.create_order(
             token_in="0x82aF49447D8a07e3bd95BD0d56f35241523fBab1",  # WETH
             token_out="0xFF970A61A04b1cA14834A43f5dE4533eBDDB5CC8",  # USDC
             amount_in="1000000000000000000",  # 1 WETH
             min_amount_out="1800000000",  # 1800 USDC
             is_market=True
         )
-        print(f"Order response: {json.dumps(order, indent=2)}")
+        print(f"Order response: {pretty_json(order)}")
         
     except Exception as e:
         print(f"Error: {e}")
+    finally:
+        client.close()
+        await client.aclose()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    asyncio.run(main()) 
\ No newline at end of file
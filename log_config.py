@@ -0,0 +1,49 @@
+import sys
+import queue
+import logging
+import logging.handlers
+from typing import Optional
+
+def start_queue_logging(
+    log_file: Optional[str] = None,
+    console: bool = True,
+    level: int = logging.INFO
+) -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue drained by a background thread.
+
+    Log calls on the event loop only enqueue the record; formatting and the
+    blocking file/stdout writes happen on the listener thread.
+
+    Args:
+        log_file: Rotating log file to write to (10 MB x 3 backups), if any
+        console: Whether to also write messages to stdout
+        level: Root logger level
+
+    Returns:
+        The started QueueListener; call stop() on shutdown to flush it
+    """
+    handlers = []
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=10_000_000,
+            backupCount=3
+        )
+        file_handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        )
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter("%(message)s"))
+        handlers.append(console_handler)
+
+    log_queue = queue.Queue(-1)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -1,14 +1,19 @@
-import json
 import time
+import logging
 import requests
-from typing import Dict, Optional
-from pydantic import BaseModel, Field
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Type
+from pydantic import BaseModel, Field, ValidationError
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import uvicorn
-from key_generator import KeyGenerator
+from key_generator import KeyGenerator, pretty_json
 from litlayer_rest_client import LitLayerRestClient
 
+logger = logging.getLogger(__name__)
+
 # Request/Response Models
 class AuctionRequest(BaseModel):
     token_in: str = Field(..., description="Input token address")
@@ -36,6 +41,34 @@ class NotificationResponse(BaseModel):
     status: str = Field(..., description="Notification status")
     timestamp: int = Field(..., description="Response timestamp")
 
+def parse_json_body(body: bytes, model: Type[BaseModel]) -> BaseModel:
+    """
+    Parse and validate a raw JSON request body in a single pydantic-core pass.
+    
+    Args:
+        body: Raw request body
+        model: Model to validate against
+        
+    Returns:
+        Validated model instance
+        
+    Raises:
+        RequestValidationError: If the body is not valid for the model (HTTP 422)
+    """
+    try:
+        return model.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(), body=body)
+
+def json_body_schema(model: Type[BaseModel]) -> Dict:
+    """OpenAPI request body for routes that parse their JSON body manually"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": model.model_json_schema()}}
+        }
+    }
+
 class MMAuction:
     def __init__(
         self,
@@ -47,11 +80,12 @@ class MMAuction:
         self.api_key = api_key
         self.mm_endpoint = mm_endpoint
         self.client = LitLayerRestClient(base_url, api_key)
-        self.session_data = None
         self.app = FastAPI(
             title="Market Maker Auction API",
             description="API for handling JIT auctions and trade notifications",
-            version="1.0.0"
+            version="1.0.0",
+            default_response_class=ORJSONResponse,
+            lifespan=self.lifespan
         )
         
         # Add CORS middleware
@@ -66,6 +100,15 @@ class MMAuction:
         # Setup routes
         self.setup_routes()
 
+    @asynccontextmanager
+    async def lifespan(self, app: FastAPI):
+        """Keep the shared async HTTP/2 client open while the server runs"""
+        self.client.open_async_client()
+        try:
+            yield
+        finally:
+            await self.client.aclose()
+
     def register_mm_endpoint(self, agent_address: str, mm_endpoint: str) -> Dict:
         """
         Register the market maker endpoint with the agent.
@@ -78,7 +121,7 @@ class MMAuction:
         Returns:
             Registration response
         """
-        if not self.session_data:
+        if not self.client.session_data:
             raise Exception("Session not initialized. Call generate_session first.")
             
         payload = {
@@ -105,7 +148,7 @@ class MMAuction:
             Auction response
         """
         # Placeholder for actual auction logic
-        print(f"Received JIT auction request: {auction_data.dict()}")
+        logger.debug("Received JIT auction request: %s", auction_data)
         
         # Example response
         return AuctionResponse(
@@ -127,7 +170,7 @@ class MMAuction:
             Notification response
         """
         # Placeholder for actual trade notification handling
-        print(f"Received trade notification: {trade_data.dict()}")
+        logger.debug("Received trade notification: %s", trade_data.trade_id)
         
         # Example response
         return NotificationResponse(
@@ -138,34 +181,62 @@ class MMAuction:
     def setup_routes(self):
         """Setup FastAPI routes"""
         
-        @self.app.post("/jit-auction", response_model=AuctionResponse)
-        async def jit_auction(request: AuctionRequest):
+        # Bodies are decoded straight into the models and responses are
+        # serialized by pydantic-core, skipping FastAPI's dict round-trips
+        @self.app.post(
+            "/jit-auction",
+            response_model=AuctionResponse,
+            openapi_extra=json_body_schema(AuctionRequest)
+        )
+        async def jit_auction(request: Request):
+            auction_data = parse_json_body(await request.body(), AuctionRequest)
             try:
-                return await self.handle_jit_auction(request)
+                response = await self.handle_jit_auction(auction_data)
             except Exception as e:
                 raise HTTPException(status_code=500, detail=str(e))
+            return Response(response.model_dump_json(), media_type="application/json")
             
-        @self.app.post("/trade-notification", response_model=NotificationResponse)
-        async def trade_notification(request: TradeNotification):
+        @self.app.post(
+            "/trade-notification",
+            response_model=NotificationResponse,
+            openapi_extra=json_body_schema(TradeNotification)
+        )
+        async def trade_notification(request: Request):
+            trade_data = parse_json_body(await request.body(), TradeNotification)
             try:
-                return await self.handle_trade_notification(request)
+                response = await self.handle_trade_notification(trade_data)
             except Exception as e:
                 raise HTTPException(status_code=500, detail=str(e))
+            return Response(response.model_dump_json(), media_type="application/json")
 
-    def start_server(self, host: str = "0.0.0.0", port: int = 8080):
+    def start_server(self, host: str = "0.0.0.0", port: int = 8080, access_log: bool = False):
         """
         Start the market maker server using uvicorn.
         
+        uvicorn picks uvloop and the httptools parser automatically when they
+        are installed (see requirements.txt), falling back to asyncio/h11.
+        
         Args:
             host: Server host
             port: Server port
+            access_log: Whether to log every request (off by default, it
+                costs a formatted log record per auction)
         """
         print(f"Starting market maker server at http://{host}:{port}")
         print("API documentation available at /docs")
-        uvicorn.run(self.app, host=host, port=port)
+        uvicorn.run(
+            self.app,
+            host=host,
+            port=port,
+            loop="auto",
+            http="auto",
+            access_log=access_log
+        )
 
 def main():
     """Example usage of the MMAuction program"""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     # Configuration
     API_KEY = "your_api_key"
     WALLET_ADDRESS = "0x742d35Cc6634C0532925a3b844Bc454e4438f44e"
@@ -183,12 +254,12 @@ def main():
         # 1. Generate session
         print("Generating session...")
         session = mm.client.generate_session(WALLET_ADDRESS, AGENT_ADDRESS)
-        print(f"Session generated: {json.dumps(session, indent=2)}")
+        print(f"Session generated: {pretty_json(session)}")
         
         # 2. Register MM endpoint
         print("\nRegistering MM endpoint...")
         registration = mm.register_mm_endpoint(AGENT_ADDRESS, MM_ENDPOINT)
-        print(f"Registration response: {json.dumps(registration, indent=2)}")
+        print(f"Registration response: {pretty_json(registration)}")
         
         # 3. Start MM server
         print("\nStarting market maker server...")
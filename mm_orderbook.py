@@ -1,10 +1,20 @@
 import json
 import time
 import asyncio
-from typing import Dict, Optional, List
+import random
+import logging
+from typing import Dict, Optional, List, Tuple
 from datetime import datetime
+from functools import cached_property
 from pydantic import BaseModel, Field
-from litlayer_rest_client import LitLayerRestClient
+from litlayer_rest_client import LitLayerRestClient, Session
+from log_config import start_queue_logging
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+logger = logging.getLogger(__name__)
 
 class OrderConfig(BaseModel):
     """Configuration for order placement"""
@@ -23,7 +33,22 @@ class MarketData(BaseModel):
     last_price: str
     volume_24h: str
 
+    @cached_property
+    def last_price_int(self) -> int:
+        """last_price parsed once per snapshot"""
+        return int(self.last_price)
+
 class OrderBookMM:
+    # Default loop intervals in seconds, used when not passed to __init__
+    DEFAULT_PENDING_ORDER_INTERVAL = 30
+    DEFAULT_CANCEL_ORDER_INTERVAL = 10
+    DEFAULT_MARKET_DATA_INTERVAL = 1
+    # Upper bound in seconds of the exponential backoff after repeated errors
+    MAX_ERROR_BACKOFF = 60
+    # Cancel orders priced more than NUM/DEN (2%) away from the last price
+    CANCEL_THRESHOLD_NUM = 2
+    CANCEL_THRESHOLD_DEN = 100
+
     def __init__(
         self,
         base_url: str = "https://api.litlayer.com",
@@ -31,20 +56,31 @@ class OrderBookMM:
         wallet_address: str = None,
         agent_address: str = None,
         order_config: OrderConfig = None,
-        pending_order_interval: int = 30,  # seconds
-        cancel_order_interval: int = 10,   # seconds
+        pending_order_interval: int = None,  # seconds
+        cancel_order_interval: int = None,   # seconds
+        market_data_interval: int = None,    # seconds
     ):
         self.base_url = base_url
         self.api_key = api_key
         self.wallet_address = wallet_address
         self.agent_address = agent_address
         self.order_config = order_config
-        self.pending_order_interval = pending_order_interval
-        self.cancel_order_interval = cancel_order_interval
+        self.pending_order_interval = (
+            pending_order_interval if pending_order_interval is not None
+            else self.DEFAULT_PENDING_ORDER_INTERVAL
+        )
+        self.cancel_order_interval = (
+            cancel_order_interval if cancel_order_interval is not None
+            else self.DEFAULT_CANCEL_ORDER_INTERVAL
+        )
+        self.market_data_interval = (
+            market_data_interval if market_data_interval is not None
+            else self.DEFAULT_MARKET_DATA_INTERVAL
+        )
         
         # Initialize client
         self.client = LitLayerRestClient(base_url, api_key)
-        self.session_data = None
+        self.session_data: Optional[Session] = None
         
         # State management
         self.active_orders: Dict[str, Dict] = {}  # order_id -> order_data
@@ -53,11 +89,15 @@ class OrderBookMM:
         
         # Task control
         self.running = False
-        self.pending_order_task = None
-        self.cancel_order_task = None
-        self._lock = asyncio.Lock()  # For thread-safe operations
+        self._pending_task = None
+        self._cancel_task = None
+        self._market_data_task = None
+        self._lock = asyncio.Lock()  # Held only while mutating active_orders
+        self._orders_version = 0  # Bumped on every active_orders mutation
+        self._last_decision = None  # Inputs of the last completed placement pass
+        self._market_event = asyncio.Event()  # Pulsed when market data changes
 
-    def generate_session(self) -> Dict:
+    def generate_session(self) -> Session:
         """Generate a new session with trading key and signature"""
         if not self.wallet_address or not self.agent_address:
             raise Exception("Wallet address and agent address must be set")
@@ -113,65 +153,219 @@ class OrderBookMM:
     async def cancel_order(self, order_id: str) -> Dict:
         """Cancel an existing order"""
         # Placeholder: Implement actual order cancellation
-        async with self._lock:
-            if order_id in self.active_orders:
-                del self.active_orders[order_id]
+        await self._remove_order(order_id)
         return {"status": "cancelled", "order_id": order_id}
 
-    async def pending_order_task(self):
+    async def _add_orders(self, orders: List[Dict]):
+        """Record placed orders in active_orders"""
+        async with self._lock:
+            for order in orders:
+                # Parse the price once here instead of on every cancel sweep
+                order["price_int"] = int(order.get("price", 0))
+                self.active_orders[order["order_id"]] = order
+            self._orders_version += 1
+
+    async def _remove_order(self, order_id: str):
+        """Drop an order from active_orders"""
+        async with self._lock:
+            if self.active_orders.pop(order_id, None) is not None:
+                self._orders_version += 1
+
+    def _snapshot_orders(self) -> Tuple[int, List[Tuple[str, Dict]]]:
+        """
+        Optimistic read of active_orders without taking the lock.
+        
+        Returns:
+            (version, items). Copying the items does not yield to the event
+            loop, so the snapshot is consistent with the returned version;
+            compare versions later to detect mutations made in between.
+        """
+        return self._orders_version, list(self.active_orders.items())
+
+    async def _run_market_data(self):
+        """Task to poll market data and wake the order tasks when it changes"""
+        backoff = 0.0
+        last_quote = None
+        while self.running:
+            try:
+                self.market_data = await self.get_market_data()
+                quote = (
+                    self.market_data.best_bid,
+                    self.market_data.best_ask,
+                    self.market_data.last_price
+                )
+                
+                if quote != last_quote:
+                    last_quote = quote
+                    # Wake every current waiter, then re-arm for the next change
+                    self._market_event.set()
+                    self._market_event.clear()
+                
+                backoff = 0.0
+                
+            except Exception:
+                logger.exception("Error in market data task")
+                backoff = await self._sleep_after_error(backoff)
+                continue
+            
+            await asyncio.sleep(self.market_data_interval)
+
+    async def _sleep_after_error(self, backoff: float) -> float:
+        """
+        Sleep with jittered exponential backoff after a failed loop iteration.
+        
+        Args:
+            backoff: Backoff used after the previous consecutive failure (0 if none)
+            
+        Returns:
+            The backoff to pass in after the next consecutive failure
+        """
+        backoff = min(backoff * 2 + 1, self.MAX_ERROR_BACKOFF)
+        await asyncio.sleep(backoff + random.random())
+        return backoff
+
+    async def _wait_for_market_update(self, timeout: float):
+        """Wait until market data changes or the timeout expires"""
+        try:
+            await asyncio.wait_for(self._market_event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _decision_inputs(self) -> Tuple[Optional[str], Optional[str], int, int]:
+        """Inventory, orders version and price the placement pass depends on"""
+        return (
+            self.inventory.get(self.order_config.token_in),
+            self.inventory.get(self.order_config.token_out),
+            self._orders_version,
+            self.market_data.last_price_int
+        )
+
+    def _decision_unchanged(self) -> bool:
+        """
+        Whether the last placement pass saw the same inputs.
+        
+        Inventory and orders must match exactly; the price may have moved
+        by up to price_spread so quote noise doesn't trigger a new pass.
+        """
+        if self._last_decision is None:
+            return False
+        *state, price = self._decision_inputs()
+        *last_state, last_price = self._last_decision
+        return (
+            state == last_state
+            and abs(price - last_price) <= last_price * self.order_config.price_spread
+        )
+
+    async def _run_pending_orders(self):
         """Task to manage pending orders"""
+        backoff = 0.0
         while self.running:
             try:
-                # 1. Check inventory
-                self.inventory = await self.check_inventory()
+                # 1-2. Check inventory and get market data concurrently
+                self.inventory, self.market_data = await asyncio.gather(
+                    self.check_inventory(),
+                    self.get_market_data()
+                )
                 
-                # 2. Get market data
-                self.market_data = await self.get_market_data()
+                # Skip the placement pass if nothing it depends on changed
+                if self._decision_unchanged():
+                    await self._wait_for_market_update(self.pending_order_interval)
+                    continue
                 
                 # 3. Calculate order sizes based on inventory and market data
                 # This is a simplified example - implement your actual logic
-                async with self._lock:
-                    if len(self.active_orders) < self.order_config.max_orders:
-                        # Place a new order
-                        order = await self.place_order(
-                            token_in=self.order_config.token_in,
-                            token_out=self.order_config.token_out,
-                            amount_in=self.order_config.min_order_size,
-                            min_amount_out=str(int(self.market_data.last_price) * 0.99),  # 1% below market
-                            is_market=False
-                        )
-                        
-                        if "order_id" in order:
-                            self.active_orders[order["order_id"]] = order
+                # Network calls run outside the lock; only the bookkeeping takes it
+                failed = False
+                missing = self.order_config.max_orders - len(self.active_orders)
+                if missing > 0:
+                    # Place every missing order in one concurrent batch
+                    min_amount_out = str(self.market_data.last_price_int * 99 // 100)  # 1% below market
+                    orders = await asyncio.gather(
+                        *(
+                            self.place_order(
+                                token_in=self.order_config.token_in,
+                                token_out=self.order_config.token_out,
+                                amount_in=self.order_config.min_order_size,
+                                min_amount_out=min_amount_out,
+                                is_market=False
+                            )
+                            for _ in range(missing)
+                        ),
+                        return_exceptions=True
+                    )
+                    
+                    placed = []
+                    for order in orders:
+                        if isinstance(order, Exception):
+                            failed = True
+                            logger.error("Error placing order: %s", order)
+                        elif "order_id" in order:
+                            placed.append(order)
+                    if placed:
+                        await self._add_orders(placed)
+                
+                # Failed placements are retried on the next iteration
+                self._last_decision = None if failed else self._decision_inputs()
                 
-            except Exception as e:
-                print(f"Error in pending order task: {e}")
+                backoff = 0.0
+                
+            except Exception:
+                logger.exception("Error in pending order task")
+                backoff = await self._sleep_after_error(backoff)
+                continue
             
-            await asyncio.sleep(self.pending_order_interval)
+            await self._wait_for_market_update(self.pending_order_interval)
 
-    async def cancel_order_task(self):
+    async def _run_cancel_orders(self):
         """Task to manage order cancellations"""
+        backoff = 0.0
+        last_sweep = None
         while self.running:
             try:
-                # 1. Get latest market data
-                self.market_data = await self.get_market_data()
+                # Market data is kept current by the market data task
+                if self.market_data is None:
+                    await self._wait_for_market_update(self.cancel_order_interval)
+                    continue
+                
+                # Skip the sweep if neither the orders nor the price changed
+                current_price = self.market_data.last_price_int
+                version, orders = self._snapshot_orders()
+                if (version, current_price) == last_sweep:
+                    await self._wait_for_market_update(self.cancel_order_interval)
+                    continue
+                
+                # Collect every order to cancel from the lock-free snapshot
+                victims = []
+                max_diff = current_price * self.CANCEL_THRESHOLD_NUM
+                for order_id, order in orders:
+                    # Example cancellation logic:
+                    # Cancel if price moved more than 2% from order price,
+                    # compared in exact integer math instead of a float ratio
+                    if abs(order["price_int"] - current_price) * self.CANCEL_THRESHOLD_DEN > max_diff:
+                        victims.append(order_id)
+                
+                # Cancel concurrently; cancel_order takes the lock only for its bookkeeping
+                results = await asyncio.gather(
+                    *(self.cancel_order(order_id) for order_id in victims),
+                    return_exceptions=True
+                )
+                failed = False
+                for order_id, result in zip(victims, results):
+                    if isinstance(result, Exception):
+                        failed = True
+                        logger.error("Error cancelling order %s: %s", order_id, result)
+                
+                # Failed cancellations are retried on the next sweep
+                last_sweep = None if failed else (version, current_price)
                 
-                # 2. Check each active order
-                async with self._lock:
-                    for order_id, order in list(self.active_orders.items()):
-                        # Example cancellation logic:
-                        # Cancel if price moved more than 2% from order price
-                        order_price = int(order.get("price", 0))
-                        current_price = int(self.market_data.last_price)
-                        price_diff_pct = abs(order_price - current_price) / current_price
-                        
-                        if price_diff_pct > 0.02:  # 2% threshold
-                            await self.cancel_order(order_id)
+                backoff = 0.0
                 
-            except Exception as e:
-                print(f"Error in cancel order task: {e}")
+            except Exception:
+                logger.exception("Error in cancel order task")
+                backoff = await self._sleep_after_error(backoff)
+                continue
             
-            await asyncio.sleep(self.cancel_order_interval)
+            await self._wait_for_market_update(self.cancel_order_interval)
 
     async def start(self):
         """Start the market maker"""
@@ -181,33 +375,31 @@ class OrderBookMM:
         self.running = True
         
         # Start tasks
-        self.pending_order_task = asyncio.create_task(self.pending_order_task())
-        self.cancel_order_task = asyncio.create_task(self.cancel_order_task())
+        self._market_data_task = asyncio.create_task(self._run_market_data())
+        self._pending_task = asyncio.create_task(self._run_pending_orders())
+        self._cancel_task = asyncio.create_task(self._run_cancel_orders())
         
-        print("Market maker started")
-        print(f"Pending order interval: {self.pending_order_interval}s")
-        print(f"Cancel order interval: {self.cancel_order_interval}s")
+        logger.info("Market maker started")
+        logger.info("Pending order interval: %ss", self.pending_order_interval)
+        logger.info("Cancel order interval: %ss", self.cancel_order_interval)
+        logger.info("Market data interval: %ss", self.market_data_interval)
 
     async def stop(self):
         """Stop the market maker"""
         self.running = False
         
-        # Cancel tasks
-        if self.pending_order_task:
-            self.pending_order_task.cancel()
-            try:
-                await self.pending_order_task
-            except asyncio.CancelledError:
-                pass
-                
-        if self.cancel_order_task:
-            self.cancel_order_task.cancel()
-            try:
-                await self.cancel_order_task
-            except asyncio.CancelledError:
-                pass
-            
-        print("Market maker stopped")
+        # Cancel tasks and wait for all of them to finish
+        tasks = [
+            task for task in (self._market_data_task, self._pending_task, self._cancel_task)
+            if task is not None
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._market_data_task = self._pending_task = self._cancel_task = None
+        
+        await self.client.aclose()
+        logger.info("Market maker stopped")
 
 async def main():
     """Example usage of the OrderBookMM"""
@@ -226,6 +418,9 @@ async def main():
         max_orders=5
     )
     
+    # Log through a background thread so file writes never block the event loop
+    listener = start_queue_logging("mm_orderbook.log")
+    
     try:
         # Initialize market maker
         mm = OrderBookMM(
@@ -246,11 +441,17 @@ async def main():
             while True:
                 await asyncio.sleep(1)
         except KeyboardInterrupt:
-            print("\nStopping market maker...")
+            logger.info("Stopping market maker...")
             await mm.stop()
             
-    except Exception as e:
-        print(f"Error: {e}")
+    except Exception:
+        logger.exception("Market maker failed")
+    finally:
+        listener.stop()
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    # uvloop is POSIX-only; fall back to the default asyncio loop elsewhere
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
\ No newline at end of file
@@ -1,10 +1,75 @@
 import asyncio
 import time
+import math
 import random
-from typing import List, Dict
+import logging
+from array import array
+from typing import Dict, Optional
 import aiohttp
-import statistics
-from datetime import datetime
+import numpy as np
+import orjson
+from log_config import start_queue_logging
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+logger = logging.getLogger(__name__)
+
+# Fixed auction pair and request headers for every generated auction request
+WETH = "0x82aF49447D8a07e3bd95BD0d56f35241523fBab1"
+USDC = "0xFF970A61A04b1cA14834A43f5dE4533eBDDB5CC8"
+JSON_HEADERS = {"Content-Type": "application/json"}
+# Idle keep-alive and per-request timeouts of the shared HTTP session, in seconds
+KEEPALIVE_TIMEOUT = 4
+REQUEST_TIMEOUT = 10
+
+class ResponseStats:
+    """Numeric results of one test run; raw responses are streamed to disk"""
+    def __init__(self):
+        # Unboxed doubles: 8 bytes per sample instead of a list of float objects
+        self.response_times = array("d")
+        self.successful = 0
+        # Running moments, updated in the same pass that records each sample
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.max = 0.0
+
+    @property
+    def count(self) -> int:
+        return len(self.response_times)
+
+    def add(self, result: Dict):
+        """Record the numbers of a single request result"""
+        response_time = result["response_time"]
+        self.response_times.append(response_time)
+        self.total += response_time
+        self.total_sq += response_time * response_time
+        if response_time > self.max:
+            self.max = response_time
+        if result["status"] == 200:
+            self.successful += 1
+
+    def summary(self) -> Dict:
+        """Count, success count, mean, std, max and p50/p95/p99 response time"""
+        count = self.count
+        mean = self.total / count
+        # Clamp tiny negative variances caused by rounding
+        std = math.sqrt(max(self.total_sq / count - mean * mean, 0.0))
+        p50, p95, p99 = np.percentile(
+            np.frombuffer(self.response_times, dtype=np.float64),
+            [50, 95, 99]
+        )
+        return {
+            "count": count,
+            "successful": self.successful,
+            "mean": mean,
+            "std": std,
+            "max": self.max,
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99)
+        }
 
 class AuctionTester:
     def __init__(
@@ -20,8 +85,11 @@ class AuctionTester:
         max_concurrent: int = 100,
         step_size: int = 10,
         step_duration: int = 30,  # 30 seconds per step
+        # Seed for the generated request parameters (None = random)
+        seed: Optional[int] = None,
     ):
         self.base_url = base_url
+        self._auction_url = f"{base_url}/jit-auction"
         # Load test params
         self.num_requests = num_requests
         self.concurrent_requests = concurrent_requests
@@ -33,171 +101,234 @@ class AuctionTester:
         self.step_size = step_size
         self.step_duration = step_duration
         
+        # Per-test summaries; raw results go to the results file
         self.results = {
-            "load_test": [],
-            "latency_test": [],
+            "load_test": None,
+            "latency_test": None,
             "stress_test": {}
         }
+        self._session = None
+        self._out = None
+        # Private PRNG for request parameters, independent of the global one
+        self._rng = random.Random(seed)
+        # Monotonic start of the current test; results carry an offset from
+        # it instead of their own wall-clock timestamp
+        self._test_start_ns = time.monotonic_ns()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared keep-alive HTTP session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            limit = max(self.concurrent_requests, self.max_concurrent)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=limit,
+                    limit_per_host=limit,
+                    ttl_dns_cache=300,
+                    force_close=False,
+                    # Drop idle connections before uvicorn's 5s keep-alive
+                    # timeout does, so a request never lands on a closed socket
+                    keepalive_timeout=KEEPALIVE_TIMEOUT
+                ),
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+            )
+        return self._session
+
+    async def close(self):
+        """Close the shared HTTP session"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _begin_test(self, test: str):
+        """Mark the start of a test; result offsets are relative to it"""
+        started_at = time.time()
+        self._test_start_ns = time.monotonic_ns()
+        if self._out is not None:
+            self._out.write(orjson.dumps({"test": test, "started_at": started_at}) + b"\n")
+
+    def _record(self, test: str, result: Dict, stats: ResponseStats):
+        """Stream a result to the results file and keep only its numbers in memory"""
+        if self._out is not None:
+            result["test"] = test
+            self._out.write(orjson.dumps(result) + b"\n")
+        stats.add(result)
 
     async def make_auction_request(self, request_id: int) -> Dict:
         """Make a single auction request"""
-        start_time = time.time()
+        start_ns = time.monotonic_ns()
         
-        auction_data = {
-            "token_in": "0x82aF49447D8a07e3bd95BD0d56f35241523fBab1",  # WETH
-            "token_out": "0xFF970A61A04b1cA14834A43f5dE4533eBDDB5CC8",  # USDC
-            "amount_in": str(random.randint(100000000000000000, 1000000000000000000)),  # 0.1-1 WETH
-            "min_amount_out": str(random.randint(1700000000, 1900000000)),  # 1700-1900 USDC
-            "is_market": random.choice([True, False])
-        }
+        # Only the amounts and order type vary; the body is encoded straight to bytes
+        payload = orjson.dumps({
+            "token_in": WETH,
+            "token_out": USDC,
+            "amount_in": str(self._rng.randint(100000000000000000, 1000000000000000000)),  # 0.1-1 WETH
+            "min_amount_out": str(self._rng.randint(1700000000, 1900000000)),  # 1700-1900 USDC
+            "is_market": bool(self._rng.getrandbits(1))
+        })
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}/jit-auction",
-                    json=auction_data
-                ) as response:
-                    response_time = time.time() - start_time
-                    status = response.status
-                    response_data = await response.json()
-                    
-                    return {
-                        "request_id": request_id,
-                        "status": status,
-                        "response_time": response_time,
-                        "response_data": response_data,
-                        "timestamp": datetime.now().isoformat()
-                    }
+            async with self._get_session().post(
+                self._auction_url,
+                data=payload,
+                headers=JSON_HEADERS
+            ) as response:
+                response_time = (time.monotonic_ns() - start_ns) / 1e9
+                status = response.status
+                response_data = orjson.loads(await response.read())
+                
+                return {
+                    "request_id": request_id,
+                    "status": status,
+                    "response_time": response_time,
+                    "response_data": response_data,
+                    "t_offset_ns": start_ns - self._test_start_ns
+                }
         except Exception as e:
             return {
                 "request_id": request_id,
                 "status": "error",
                 "error": str(e),
-                "response_time": time.time() - start_time,
-                "timestamp": datetime.now().isoformat()
+                "response_time": (time.monotonic_ns() - start_ns) / 1e9,
+                "t_offset_ns": start_ns - self._test_start_ns
             }
 
     async def run_load_test(self):
         """Run load test"""
-        print("\n=== Running Load Test ===")
-        print(f"Total requests: {self.num_requests}")
-        print(f"Concurrent requests: {self.concurrent_requests}")
+        logger.info("=== Running Load Test ===")
+        logger.info("Total requests: %s", self.num_requests)
+        logger.info("Concurrent requests: %s", self.concurrent_requests)
+        self._begin_test("load_test")
         
         start_time = time.time()
         sem = asyncio.Semaphore(self.concurrent_requests)
+        stats = ResponseStats()
         
         async def bounded_request(request_id: int):
             async with sem:
                 result = await self.make_auction_request(request_id)
-                self.results["load_test"].append(result)
+                self._record("load_test", result, stats)
         
         tasks = [bounded_request(i) for i in range(self.num_requests)]
         await asyncio.gather(*tasks)
         
         # Calculate statistics
         total_time = time.time() - start_time
-        response_times = [r["response_time"] for r in self.results["load_test"]]
-        successful_requests = len([r for r in self.results["load_test"] if r["status"] == 200])
+        summary = self.results["load_test"] = stats.summary()
         
-        print("\nLoad Test Results:")
-        print(f"Total time: {total_time:.2f}s")
-        print(f"Successful requests: {successful_requests}/{self.num_requests}")
-        print(f"Average response time: {statistics.mean(response_times):.3f}s")
-        print(f"Requests per second: {self.num_requests / total_time:.2f}")
+        logger.info("Load Test Results:")
+        logger.info("Total time: %.2fs", total_time)
+        logger.info("Successful requests: %s/%s", summary['successful'], self.num_requests)
+        logger.info("Average response time: %.3fs", summary['mean'])
+        logger.info("Requests per second: %.2f", self.num_requests / total_time)
 
     async def run_latency_test(self):
         """Run latency test"""
-        print("\n=== Running Latency Test ===")
-        print(f"Duration: {self.latency_duration}s")
+        logger.info("=== Running Latency Test ===")
+        logger.info("Duration: %ss", self.latency_duration)
+        self._begin_test("latency_test")
         
         start_time = time.time()
         request_id = 0
+        stats = ResponseStats()
         
         while time.time() - start_time < self.latency_duration:
             result = await self.make_auction_request(request_id)
-            self.results["latency_test"].append(result)
+            self._record("latency_test", result, stats)
             
             if request_id % 10 == 0:
                 elapsed = time.time() - start_time
-                print(f"Progress: {elapsed:.1f}s / {self.latency_duration}s")
+                logger.info("Progress: %.1fs / %ss", elapsed, self.latency_duration)
             
             request_id += 1
             await asyncio.sleep(1.0)  # 1 request per second
         
         # Calculate statistics
-        response_times = [r["response_time"] for r in self.results["latency_test"]]
-        successful_requests = len([r for r in self.results["latency_test"] if r["status"] == 200])
+        summary = self.results["latency_test"] = stats.summary()
         
-        print("\nLatency Test Results:")
-        print(f"Total requests: {len(self.results['latency_test'])}")
-        print(f"Successful requests: {successful_requests}")
-        print(f"Average response time: {statistics.mean(response_times):.3f}s")
-        print(f"95th percentile: {sorted(response_times)[int(len(response_times) * 0.95)]:.3f}s")
+        logger.info("Latency Test Results:")
+        logger.info("Total requests: %s", summary['count'])
+        logger.info("Successful requests: %s", summary['successful'])
+        logger.info("Average response time: %.3fs", summary['mean'])
+        logger.info("50th percentile: %.3fs", summary['p50'])
+        logger.info("95th percentile: %.3fs", summary['p95'])
+        logger.info("99th percentile: %.3fs", summary['p99'])
 
     async def run_stress_test(self):
         """Run stress test"""
-        print("\n=== Running Stress Test ===")
-        print(f"Initial concurrent: {self.initial_concurrent}")
-        print(f"Max concurrent: {self.max_concurrent}")
-        print(f"Step size: {self.step_size}")
-        print(f"Step duration: {self.step_duration}s")
+        logger.info("=== Running Stress Test ===")
+        logger.info("Initial concurrent: %s", self.initial_concurrent)
+        logger.info("Max concurrent: %s", self.max_concurrent)
+        logger.info("Step size: %s", self.step_size)
+        logger.info("Step duration: %ss", self.step_duration)
+        self._begin_test("stress_test")
         
         current_concurrent = self.initial_concurrent
         
         while current_concurrent <= self.max_concurrent:
-            print(f"\nTesting {current_concurrent} concurrent requests...")
+            logger.info("Testing %s concurrent requests...", current_concurrent)
             
-            results = []
-            start_time = time.time()
+            stats = ResponseStats()
+            end_time = time.time() + self.step_duration
             request_id = 0
+            pending = set()
             
-            # Run stress step
-            while time.time() - start_time < self.step_duration:
-                tasks = [
-                    self.make_auction_request(request_id + i)
-                    for i in range(current_concurrent)
-                ]
-                step_results = await asyncio.gather(*tasks)
-                results.extend(step_results)
-                request_id += current_concurrent
-            
-            self.results["stress_test"][current_concurrent] = results
+            # Run stress step: keep current_concurrent requests in flight,
+            # starting the next one as soon as any request completes
+            while pending or time.time() < end_time:
+                while len(pending) < current_concurrent and time.time() < end_time:
+                    pending.add(asyncio.create_task(self.make_auction_request(request_id)))
+                    request_id += 1
+                if not pending:
+                    break
+                
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    result["concurrency"] = current_concurrent
+                    self._record("stress_test", result, stats)
             
             # Calculate statistics
-            response_times = [r["response_time"] for r in results]
-            successful_requests = len([r for r in results if r["status"] == 200])
+            summary = self.results["stress_test"][current_concurrent] = stats.summary()
             
-            print(f"Results for {current_concurrent} concurrent requests:")
-            print(f"Successful requests: {successful_requests}/{len(results)}")
-            print(f"Average response time: {statistics.mean(response_times):.3f}s")
-            print(f"Requests per second: {len(results) / self.step_duration:.2f}")
+            logger.info("Results for %s concurrent requests:", current_concurrent)
+            logger.info("Successful requests: %s/%s", summary['successful'], summary['count'])
+            logger.info("Average response time: %.3fs", summary['mean'])
+            logger.info("95th percentile: %.3fs", summary['p95'])
+            logger.info("Requests per second: %.2f", summary['count'] / self.step_duration)
             
             # Check if system is still responding well
-            if statistics.mean(response_times) > 1.0 or successful_requests / len(results) < 0.95:
-                print("\nSystem showing signs of stress. Stopping test.")
+            if summary["mean"] > 1.0 or summary["successful"] / summary["count"] < 0.95:
+                logger.warning("System showing signs of stress. Stopping test.")
                 break
             
             current_concurrent += self.step_size
 
     async def run_all_tests(self):
         """Run all tests in sequence"""
-        print("Starting comprehensive market maker auction tests...")
-        
-        # Run load test
-        await self.run_load_test()
+        logger.info("Starting comprehensive market maker auction tests...")
         
-        # Run latency test
-        await self.run_latency_test()
-        
-        # Run stress test
-        await self.run_stress_test()
+        # Raw results are streamed as JSON lines while the tests run
+        self._out = open("auction_test_results.jsonl", "wb")
+        try:
+            # Run load test
+            await self.run_load_test()
+            
+            # Run latency test
+            await self.run_latency_test()
+            
+            # Run stress test
+            await self.run_stress_test()
+        finally:
+            await self.close()
+            self._out.close()
+            self._out = None
         
-        # Save all results
-        with open("auction_test_results.json", "w") as f:
-            import json
-            json.dump(self.results, f, indent=2)
+        # Save the summaries
+        with open("auction_test_results.json", "wb") as f:
+            f.write(orjson.dumps(self.results, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
         
-        print("\nAll tests completed. Results saved to auction_test_results.json")
+        logger.info("All tests completed.")
+        logger.info("Summaries saved to auction_test_results.json, raw results to auction_test_results.jsonl")
 
 async def main():
     # Configuration with reasonable defaults for quick testing
@@ -215,7 +346,16 @@ async def main():
         step_duration=30
     )
     
-    await tester.run_all_tests()
+    # Log through a background thread so file writes never block the event loop
+    listener = start_queue_logging("auction_test.log")
+    try:
+        await tester.run_all_tests()
+    finally:
+        listener.stop()
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    # uvloop is POSIX-only; fall back to the default asyncio loop elsewhere
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
\ No newline at end of file